@@ -0,0 +1,55 @@
+import sys
+
+from db.dao import SpecialitySqlDataMapper, StudentSqlDataMapper
+from utils.db import Databases
+
+
+def rebuild_name_index(database):
+    StudentSqlDataMapper(database).rebuild_name_index()
+    print("Полнотекстовый индекс имен студентов перестроен [БД: {0}]".format(database))
+
+
+def enable_change_log(database):
+    StudentSqlDataMapper(database).enable_change_log()
+    print("Журнал изменений включен [БД: {0}]".format(database))
+
+
+def compact_change_log(database, version):
+    for dao in (StudentSqlDataMapper(database), SpecialitySqlDataMapper(database)):
+        removed = dao.compact_changes(int(version))
+        print("Журнал изменений таблицы '{0}' сжат до версии {1}: удалено записей {2}".format(dao.table, version,
+                                                                                         removed))
+
+
+_COMMANDS = {
+    "rebuild-name-index": rebuild_name_index,
+    "enable-change-log": enable_change_log,
+    "compact-change-log": compact_change_log
+}
+
+
+def main(args):
+    """
+    Служебные команды для работы с БД: \n
+    python -m db rebuild-name-index [БД] \n
+    python -m db enable-change-log [БД] \n
+    python -m db compact-change-log ВЕРСИЯ [БД] \n
+    БД: sqlite | sqlite-sharded | sqlite-memory. По-умолчанию = sqlite
+    """
+    if not args or args[0] not in _COMMANDS:
+        print(main.__doc__)
+        return 1
+
+    command, params = _COMMANDS[args[0]], args[1:]
+    if command is compact_change_log:
+        if not params:
+            print(main.__doc__)
+            return 1
+        command(params[1] if len(params) > 1 else Databases.SQLITE, params[0])
+    else:
+        command(params[0] if params else Databases.SQLITE)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,12 +1,46 @@
+import heapq
+import itertools
+
 from abc import ABCMeta, abstractmethod, abstractproperty
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 
-from utils.db import ConnectionManager, Databases
+from properties import SQLITE_CREATE_FTS_SCRIPT, SQLITE_REBUILD_FTS_SCRIPT, SQLITE_CREATE_CHANGELOG_SCRIPT
+from utils.db import ConnectionManager, Databases, ShardedSqliteConnectionManager
 from utils.exceptions import DAOException
-from domain.entities import Speciality, Student
+from domain.entities import Change, Speciality, Student
 
 from sqlite3 import DatabaseError
 
 
+@lru_cache(maxsize=None)
+def _row_type(columns):
+    return namedtuple("Row", columns, rename=True)
+
+
+@lru_cache(maxsize=None)
+def _fields_getter(columns, fields):
+    """
+    Функция возвращает функцию выборки значений колонок fields (в указанном порядке) из строки результата
+    запроса с колонками columns или None, если колонки запроса уже начинаются с fields.
+    Создается один раз для каждого набора колонок запроса
+    """
+    if columns[:len(fields)] == fields:
+        return None
+
+    indices = [columns.index(field) for field in fields]
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda row: (row[index],)
+    return itemgetter(*indices)
+
+
+def _query_columns(cursor):
+    return tuple(column[0] for column in cursor.description)
+
+
 class IDataMapper(metaclass=ABCMeta):
     """
     Интерфейс, содержащий определения методов получения данных из какого-либо источника (БД / XML и пр.)
@@ -62,6 +96,21 @@ class AbstractSqlDataMapper(metaclass=ABCMeta):
     Класс-примесь, реализующий CRUD-операции по добавлению сущности в указанную БД
     Базовый класс преобразователь данных БД
     """
+    # Колонки таблицы, доступные для выборки (проекции)
+    _COLUMNS = ()
+    # Кол-во записей, читаемых из БД за один раз при потоковом чтении
+    _BATCH_SIZE = 500
+    # Порция журнала изменений и версия сжатия журнала - одним запросом (единый снимок БД)
+    _SQL_CHANGES_PAGE = """\
+        SELECT compaction.version AS compacted, changes.version, changes.op, changes.row_id \
+        FROM (SELECT ifnull((SELECT version FROM ChangeLogCompaction WHERE table_name = :table_name), 0) AS version) \
+          AS compaction \
+        LEFT JOIN (SELECT version, op, row_id FROM ChangeLog \
+                   WHERE table_name = :table_name AND version > :version \
+                   ORDER BY version LIMIT :limit) AS changes ON 1 \
+        ORDER BY changes.version \
+        """
+
     @abstractproperty
     def database(self):
         """
@@ -70,103 +119,365 @@ class AbstractSqlDataMapper(metaclass=ABCMeta):
         """
         pass
 
-    def _save(self, sql, params):
-        connect_manager = ConnectionManager.factory(self.database)
+    @abstractproperty
+    def table(self):
+        """
+        Таблица БД, с которой работает преобразователь \n
+        :return: имя таблицы
+        """
+        pass
+
+    def enable_change_log(self):
+        """
+        Метод создает (если отсутствует) журнал изменений таблиц Student и Speciality, ведущийся триггерами
+        """
+        self.__check_change_log_supported()
+        with open(SQLITE_CREATE_CHANGELOG_SCRIPT, encoding="utf-8") as script_file:
+            self._execute_script(script_file.read())
+
+    def get_last_change_version(self):
+        """
+        Метод возвращает версию последнего изменения таблицы (0 - изменений нет). Учитывается версия сжатия
+        журнала, поэтому после удаления всех изменений версия не уменьшается.
+        Используется для начальной синхронизации: find_all(), затем get_changes_since(версия) \n
+        :return: версия
+        """
+        self.__check_change_log_supported()
+        row = self._find_by_id("""\
+            SELECT max(ifnull((SELECT max(version) FROM ChangeLog WHERE table_name = :table_name), 0), \
+                       ifnull((SELECT version FROM ChangeLogCompaction WHERE table_name = :table_name), 0))""",
+                               {"table_name": self.table})
+        return row[0]
+
+    def get_changes_since(self, version, limit=None):
+        """
+        Метод-генератор возвращает изменения таблицы с версией больше указанной в порядке версий \n
+        :param version: последняя обработанная потребителем версия (0 - с начала журнала)
+        :param limit: макс. кол-во изменений. По-умолчанию - без ограничений
+        :return: генератор сущностей Change
+        """
+        self.__check_change_log_supported()
+
+        def fetch_page(last, count):
+            after = version if last is None else last.version
+            records = self._find_all(self._SQL_CHANGES_PAGE, {"table_name": self.table, "version": after,
+                                                              "limit": self._BATCH_SIZE},
+                                     fields=("compacted", "version", "op", "row_id"))
+
+            # Версия сжатия читается тем же запросом, что и изменения: изменения до нее удалены из журнала,
+            # потребитель должен синхронизироваться заново
+            compacted = records[0][0]
+            if after < compacted:
+                raise DAOException("Журнал изменений таблицы '{0}' сжат до версии {1}: требуется полная синхронизация"
+                                   .format(self.table, compacted))
+            return [Change(version=change_version, op=op, entity_id=row_id)
+                    for _, change_version, op, row_id in records if change_version is not None]
+
+        for found, change in enumerate(self._iter_pages(fetch_page)):
+            if limit is not None and found >= limit:
+                break
+            yield change
+
+    def compact_changes(self, version):
+        """
+        Метод удаляет из журнала изменения таблицы с версией не больше указанной \n
+        :param version: версия, до которой (включительно) изменения обработаны всеми потребителями
+        :return: кол-во удаленных записей журнала
+        """
+        self.__check_change_log_supported()
+
+        # Сначала зафиксировать версию сжатия, чтобы отстающие потребители не пропустили удаленные изменения.
+        # Версия ограничивается последним изменением в журнале: иначе новые изменения считались бы сжатыми
+        self._update("""\
+            INSERT INTO ChangeLogCompaction(table_name, version) \
+            VALUES (:table_name, min(:version, ifnull((SELECT max(version) FROM ChangeLog \
+                                                       WHERE table_name = :table_name), 0))) \
+            ON CONFLICT(table_name) DO UPDATE SET version = max(version, excluded.version)""",
+                     {"table_name": self.table, "version": version})
+
+        # Удаляются изменения только до зафиксированной версии сжатия
+        return self._delete("""\
+            DELETE FROM ChangeLog WHERE table_name = :table_name \
+            AND version <= (SELECT version FROM ChangeLogCompaction WHERE table_name = :table_name)""",
+                            {"table_name": self.table})
+
+    def __check_change_log_supported(self):
+        # Версии изменений в шардах независимы - единый порядок изменений не определен
+        if self.database == Databases.SQLITE_SHARDED:
+            raise DAOException("Журнал изменений не поддерживается для шардированной БД")
+
+    def _save(self, sql, params, shard=None):
+        connect_manager = ConnectionManager.factory(self.database, shard)
         cursor = connect_manager.get_connection().cursor()
         row_id = 0
 
-        try:
-            cursor.execute(sql, params)
-        except DatabaseError as err:
-            connect_manager.get_connection().rollback()
-            raise DAOException("Не удалось добавить запись в БД: '{0}'".format(str(err))) from err
-        else:
-            connect_manager.get_connection().commit()
-            row_id = cursor.lastrowid
-            print("В БД добавлена запись! [ID={0}]".format(row_id))
-        finally:
-            cursor.close()
-            connect_manager.close_connection()
+        with connect_manager.lock():
+            try:
+                cursor.execute(sql, params)
+                connect_manager.write_through(sql, params, cursor.lastrowid)
+            except DatabaseError as err:
+                connect_manager.get_connection().rollback()
+                raise DAOException("Не удалось добавить запись в БД: '{0}'".format(str(err))) from err
+            else:
+                connect_manager.get_connection().commit()
+                row_id = cursor.lastrowid
+                print("В БД добавлена запись! [ID={0}]".format(row_id))
+            finally:
+                cursor.close()
+                connect_manager.close_connection()
         return row_id
 
-    def _update(self, sql, params):
-        connect_manager = ConnectionManager.factory(self.database)
+    def _update(self, sql, params, shard=None):
+        connect_manager = ConnectionManager.factory(self.database, shard)
         cursor = connect_manager.get_connection().cursor()
         affected_rows = 0
 
-        try:
-            cursor.execute(sql, params)
-        except DatabaseError as err:
-            connect_manager.get_connection().rollback()
-            raise DAOException("Не удалось обновить объект в БД: '{0}'".format(str(err))) from err
-        else:
-            connect_manager.get_connection().commit()
-            affected_rows = cursor.rowcount
-            print("В БД обновлено записей: {0}".format(affected_rows))
-        finally:
-            cursor.close()
-            connect_manager.close_connection()
+        with connect_manager.lock():
+            try:
+                cursor.execute(sql, params)
+                connect_manager.write_through(sql, params)
+            except DatabaseError as err:
+                connect_manager.get_connection().rollback()
+                raise DAOException("Не удалось обновить объект в БД: '{0}'".format(str(err))) from err
+            else:
+                connect_manager.get_connection().commit()
+                affected_rows = cursor.rowcount
+                print("В БД обновлено записей: {0}".format(affected_rows))
+            finally:
+                cursor.close()
+                connect_manager.close_connection()
         return affected_rows
 
-    def _delete(self, sql, params):
-        connect_manager = ConnectionManager.factory(self.database)
+    def _delete(self, sql, params, shard=None):
+        connect_manager = ConnectionManager.factory(self.database, shard)
         cursor = connect_manager.get_connection().cursor()
         affected_rows = 0
 
-        try:
-            cursor.execute(sql, params)
-        except DatabaseError as err:
-            connect_manager.get_connection().rollback()
-            raise DAOException("Не удалось удалить объект из БД: '{0}'".format(str(err))) from err
-        else:
-            connect_manager.get_connection().commit()
-            affected_rows = cursor.rowcount
-            print("Из БД удалено записей: {0}".format(affected_rows))
-        finally:
-            cursor.close()
-            connect_manager.close_connection()
+        with connect_manager.lock():
+            try:
+                cursor.execute(sql, params)
+                connect_manager.write_through(sql, params)
+            except DatabaseError as err:
+                connect_manager.get_connection().rollback()
+                raise DAOException("Не удалось удалить объект из БД: '{0}'".format(str(err))) from err
+            else:
+                connect_manager.get_connection().commit()
+                affected_rows = cursor.rowcount
+                print("Из БД удалено записей: {0}".format(affected_rows))
+            finally:
+                cursor.close()
+                connect_manager.close_connection()
         return affected_rows
 
-    def _find_by_id(self, sql, params):
-        connect_manager = ConnectionManager.factory(self.database)
+    def _find_by_id(self, sql, params, shard=None, fields=None):
+        connect_manager = ConnectionManager.factory(self.database, shard)
         cursor = connect_manager.get_connection().cursor()
 
-        try:
-            cursor.execute(sql, params)
-        except DatabaseError as err:
-            raise DAOException("Не удалось найти объект в БД. Причина: '{1}'".format(str(err))) \
-                from err
-        else:
-            row = cursor.fetchone()  # Прочитать 1 строку результата запроса -> tuple()
-        finally:
-            cursor.close()
-            connect_manager.close_connection()
-
+        with connect_manager.lock():
+            try:
+                cursor.execute(sql, params)
+            except DatabaseError as err:
+                raise DAOException("Не удалось найти объект в БД. Причина: '{0}'".format(str(err))) \
+                    from err
+            else:
+                row = cursor.fetchone()  # Прочитать 1 строку результата запроса -> tuple()
+                getter = _fields_getter(_query_columns(cursor), fields) if fields else None
+            finally:
+                cursor.close()
+                connect_manager.close_connection()
+
+        # Значения колонок - в порядке fields (по именам колонок результата запроса)
+        if getter is not None and row is not None:
+            row = getter(row)
         return row
 
-    def _find_all(self, sql):
-        connect_manager = ConnectionManager.factory(self.database)
+    def _find_all(self, sql, params=(), shard=None, fields=None):
+        connect_manager = ConnectionManager.factory(self.database, shard)
         cursor = connect_manager.get_connection().cursor()
 
-        try:
-            cursor.execute(sql)
-        except DatabaseError as err:
-            raise DAOException("Не удалось получить все записи из БД. Причина: '{0}'".format(str(err))) \
-                from err
+        with connect_manager.lock():
+            try:
+                cursor.execute(sql, params)
+            except DatabaseError as err:
+                raise DAOException("Не удалось получить все записи из БД. Причина: '{0}'".format(str(err))) \
+                    from err
+            else:
+                rows = cursor.fetchall()  # Прочитать все записи из результата запроса -> []
+                getter = _fields_getter(_query_columns(cursor), fields) if fields else None
+                print("Из БД получено записей: {0}".format(len(rows)))
+            finally:
+                cursor.close()
+                connect_manager.close_connection()
+
+        # Значения колонок - в порядке fields (по именам колонок результата запроса)
+        if getter is not None:
+            rows = list(map(getter, rows))
+        return rows
+
+    def _iter_pages(self, fetch_page):
+        """
+        Метод-генератор читает записи порциями по _BATCH_SIZE: fetch_page(последняя запись предыдущей порции
+        или None, кол-во прочитанных записей) -> []. Соединение с БД открывается только на время чтения порции,
+        поэтому незавершенное чтение не блокирует другие операции с БД
+        """
+        last, count = None, 0
+        while True:
+            rows = fetch_page(last, count)
+            yield from rows
+            count += len(rows)
+            if len(rows) < self._BATCH_SIZE:
+                return
+            last = rows[-1]
+
+    @staticmethod
+    def _merge_shards(shard_rows, key):
+        """
+        Метод-генератор объединяет потоки записей шардов по мере чтения
+        (записи в каждом потоке должны быть упорядочены по key) \n
+        :param shard_rows: потоки записей шардов
+        :param key: ключ упорядочивания. None - потоки читаются по очереди, без упорядочивания
+        """
+        if key is None:
+            yield from itertools.chain.from_iterable(shard_rows)
         else:
-            rows = cursor.fetchall()  # Прочитать все записи из результата запроса -> []
-            print("Из БД получено записей: {0}".format(len(rows)))
-        finally:
-            cursor.close()
-            connect_manager.close_connection()
+            yield from heapq.merge(*shard_rows, key=key)
+
+    def _execute_script(self, script, shard=None):
+        """
+        Метод выполняет SQL-скрипт (изменение структуры БД, перестроение индексов и пр.)
+        """
+        connect_manager = ConnectionManager.factory(self.database, shard)
+        connection = connect_manager.get_connection()
+
+        with connect_manager.lock():
+            try:
+                connection.executescript(script)
+                connect_manager.write_through(script)
+            except DatabaseError as err:
+                connection.rollback()
+                raise DAOException("Не удалось выполнить скрипт в БД. Причина: '{0}'".format(str(err))) from err
+            finally:
+                connect_manager.close_connection()
+
+    def _scatter_find_all(self, sql, params=(), key=itemgetter(0), fields=None):
+        """
+        Метод параллельно выполняет запрос во всех шардах БД и объединяет результаты,
+        упорядочивая их по key (по-умолчанию - по первой колонке, ИД). key = None - без упорядочивания \n
+        :return: []
+        """
+        shards = ShardedSqliteConnectionManager.shards()
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            results = executor.map(lambda shard: self._find_all(sql, params, shard, fields), shards)
+            rows = [row for shard_rows in results for row in shard_rows]
 
+        if key is not None:
+            rows.sort(key=key)
         return rows
 
+    def _projection_sql(self, columns, as_):
+        """
+        Метод формирует запрос выборки указанных колонок таблицы (проекции) \n
+        :param columns: имена колонок. None - все колонки таблицы
+        :param as_: тип строк результата: "tuple" | "namedtuple"
+        :return: (запрос, колонки)
+        """
+        if as_ not in ("tuple", "namedtuple"):
+            raise ValueError("Неверный тип строк проекции: '{0}'. Допустимо: 'tuple' | 'namedtuple'".format(as_))
+
+        columns = self._COLUMNS if columns is None else tuple(columns)
+        unknown = set(columns) - set(self._COLUMNS)
+        if not columns or unknown:
+            raise ValueError("Неверные колонки таблицы {0}: {1}".format(self.table, sorted(unknown) or columns))
 
-class StudentSqlDataMapper(IDataMapper, AbstractSqlDataMapper):
+        return "SELECT {0} from {1}".format(", ".join(columns), self.table), columns
+
+    def _replicate_save(self, sql, params):
+        """
+        Метод добавляет запись справочника во все шарды БД с единым ИД (ИД выделяется в шарде 0).
+        При ошибке запись удаляется из шардов, в которые уже была добавлена \n
+        :return: ИД записи
+        """
+        row_id = self._save(sql, params, 0)
+        done = [0]
+
+        try:
+            for shard in ShardedSqliteConnectionManager.shards()[1:]:
+                self._save(sql, dict(params, id=row_id), shard)
+                done.append(shard)
+        except DAOException:
+            self.__compensate(done, self._SQL_DELETE, (row_id,), self._delete)
+            raise
+        return row_id
+
+    def _replicate_update(self, sql, params):
+        """
+        Метод обновляет запись справочника во всех шардах БД.
+        При ошибке в шардах, где запись уже обновлена, восстанавливаются прежние значения \n
+        :return: кол-во обновленных записей (в шарде 0)
+        """
+        old_params = self.__replica_params(params["id"])
+        affected_rows, done = [], []
 
-    def __init__(self):
-        self.speciality_dao = SpecialitySqlDataMapper()
+        try:
+            for shard in ShardedSqliteConnectionManager.shards():
+                affected_rows.append(self._update(sql, params, shard))
+                done.append(shard)
+        except DAOException:
+            if old_params is not None:
+                self.__compensate(done, self._SQL_UPDATE, old_params, self._update)
+            raise
+        return affected_rows[0]
+
+    def _replicate_delete(self, sql, params):
+        """
+        Метод удаляет запись справочника из всех шардов БД.
+        При ошибке запись восстанавливается в шардах, из которых уже удалена \n
+        :return: кол-во удаленных записей (в шарде 0)
+        """
+        old_params = self.__replica_params(params[0])
+        affected_rows, done = [], []
+
+        try:
+            for shard in ShardedSqliteConnectionManager.shards():
+                affected_rows.append(self._delete(sql, params, shard))
+                done.append(shard)
+        except DAOException:
+            if old_params is not None:
+                self.__compensate(done, self._SQL_INSERT, old_params, self._save)
+            raise
+        return affected_rows[0]
+
+    def __replica_params(self, entity_id):
+        # Текущие значения записи справочника (из шарда 0) - для отмены изменений в остальных шардах
+        sql, columns = self._projection_sql(None, "tuple")
+        row = self._find_by_id(sql + " where id = ?", (entity_id,), 0)
+        return None if row is None else dict(zip(columns, row))
+
+    @staticmethod
+    def __compensate(shards, sql, params, execute):
+        # Отмена изменений выполняется по возможности: ошибка отмены не должна скрыть исходную ошибку
+        for shard in shards:
+            try:
+                execute(sql, params, shard)
+            except DAOException as err:
+                print("Не удалось отменить изменение в шарде {0}: {1}".format(shard, err))
+
+
+class StudentSqlDataMapper(IDataMapper, AbstractSqlDataMapper):
+    """
+    Класс для получения данных из таблицы БД Student \n
+    В шардированной БД операции с одной записью направляются в шард записи,
+    поиск нескольких записей - параллельно во все шарды
+    """
+    _COLUMNS = ("id", "name", "age", "sex", "speciality_id")
+    # Колонки результата поиска по имени: колонки сущности и релевантность
+    _SEARCH_FIELDS = _COLUMNS + ("rank",)
+    # Наименьший ИД в SQLite (INTEGER PRIMARY KEY) - начало чтения записей по ИД
+    _MIN_ID = -2 ** 63
+
+    def __init__(self, database=Databases.SQLITE):
+        self.__database = database
+        self.speciality_dao = SpecialitySqlDataMapper(database)
         self._SQL_UPDATE = """\
         update Student \
         set name = :name, \
@@ -181,76 +492,214 @@ class StudentSqlDataMapper(IDataMapper, AbstractSqlDataMapper):
                            """
         self._SQL_FIND_ONE = "SELECT * from Student where id = ?"
         self._SQL_FIND_ALL = "SELECT * from Student"
+        self._SQL_FIND_BY_SPECIALITY = "SELECT * from Student where speciality_id = ?"
         self._SQL_DELETE = "DELETE from Student where id = ?"
+        self._SQL_SEARCH_BY_NAME = """\
+        SELECT Student.*, StudentNameIndex.rank from StudentNameIndex \
+        join Student on Student.id = StudentNameIndex.rowid \
+        where StudentNameIndex match ? \
+        order by StudentNameIndex.rank \
+        limit ? offset ? \
+        """
+        self._SQL_ITER_COLUMNS = "SELECT {0} from Student where id > ? order by id limit ?"
 
     @property
     def database(self):
-        return Databases.SQLITE
+        return self.__database
+
+    @property
+    def table(self):
+        return "Student"
+
+    @property
+    def sharded(self):
+        return self.__database == Databases.SQLITE_SHARDED
+
+    def __shard_of(self, entity_id):
+        return ShardedSqliteConnectionManager.shard_of(entity_id) if self.sharded else None
+
+    @staticmethod
+    def __name_match_expression(query):
+        # Каждое слово запроса - префикс (в кавычках, чтобы исключить операторы FTS5), "ё" индексируется как "е"
+        words = query.replace("ё", "е").replace("Ё", "Е").split()
+        return " ".join('"{0}"*'.format(word.replace('"', '""')) for word in words)
+
+    def search_by_name(self, query, limit=None):
+        """
+        Метод-генератор ищет студентов по началу слов ФИО (регистр не учитывается),
+        наиболее релевантные записи возвращаются первыми \n
+        :param query: строка поиска, напр. "иван петр" - студенты, у кот. есть слова, начинающиеся с "иван" и "петр"
+        :param limit: макс. кол-во записей. По-умолчанию - без ограничений
+        :return: генератор сущностей Student
+        """
+        expression = self.__name_match_expression(query)
+        if not expression:
+            return
+
+        def shard_pages(shard):
+            return self._iter_pages(lambda last, count: self._find_all(
+                self._SQL_SEARCH_BY_NAME, (expression, self._BATCH_SIZE, count), shard, self._SEARCH_FIELDS))
+
+        if self.sharded:
+            records = super()._merge_shards([shard_pages(shard) for shard in ShardedSqliteConnectionManager.shards()],
+                                            itemgetter(self._SEARCH_FIELDS.index("rank")))
+        else:
+            records = shard_pages(None)
+
+        # Между порциями записи могут сместиться (изменения в БД) - исключить повторы
+        found = set()
+        for record in records:
+            if limit is not None and len(found) >= limit:
+                break
+            if record[0] not in found:
+                found.add(record[0])
+                yield self.__to_entity(record)
+
+    def iter_columns(self, columns, as_="tuple"):
+        """
+        Метод-генератор возвращает значения указанных колонок всех записей (упорядочены по ИД)
+        без создания сущностей \n
+        :param columns: имена колонок таблицы Student, напр. ["id", "age"]
+        :param as_: тип строк: "tuple" | "namedtuple"
+        :return: генератор строк
+        """
+        _, columns = super()._projection_sql(columns, as_)
+
+        # Записи читаются порциями по ИД (keyset), поэтому колонка id выбирается всегда
+        selected = columns if "id" in columns else ("id",) + columns
+        id_key = itemgetter(selected.index("id"))
+        sql = self._SQL_ITER_COLUMNS.format(", ".join(selected))
+
+        def shard_pages(shard):
+            return self._iter_pages(lambda last, count: self._find_all(
+                sql, (self._MIN_ID if last is None else id_key(last), self._BATCH_SIZE), shard))
+
+        if self.sharded:
+            rows = self._merge_shards([shard_pages(shard) for shard in ShardedSqliteConnectionManager.shards()],
+                                      id_key)
+        else:
+            rows = shard_pages(None)
+
+        if selected is not columns:
+            rows = (row[1:] for row in rows)
+        return map(_row_type(columns)._make, rows) if as_ == "namedtuple" else rows
+
+    def rebuild_name_index(self):
+        """
+        Метод создает (если отсутствует) и заполняет заново полнотекстовый индекс имен студентов
+        """
+        with open(SQLITE_CREATE_FTS_SCRIPT, encoding="utf-8") as create_file, \
+                open(SQLITE_REBUILD_FTS_SCRIPT, encoding="utf-8") as rebuild_file:
+            script = create_file.read() + rebuild_file.read()
+
+        for shard in (ShardedSqliteConnectionManager.shards() if self.sharded else [None]):
+            super()._execute_script(script, shard)
 
     def update(self, entity):
         # super().update(entity)
         if not (isinstance(entity, Student)):
             raise TypeError("Неверный тип сущности для работы с БД: [{0}].".format(type(entity)))
 
-        return super()._update(self._SQL_UPDATE, entity.dict)
+        if self.sharded and entity.id is None:
+            return 0
+        return super()._update(self._SQL_UPDATE, entity.dict, self.__shard_of(entity.id))
 
     def delete(self, entity_id):
-        return super()._delete(self._SQL_DELETE, (entity_id,))
+        return super()._delete(self._SQL_DELETE, (entity_id,), self.__shard_of(entity_id))
 
     def find_by_id(self, entity_id):
         # super().find_by_id(entity_id)
         entity = None
-        row = super()._find_by_id(self._SQL_FIND_ONE, (entity_id,))
+        row = super()._find_by_id(self._SQL_FIND_ONE, (entity_id,), self.__shard_of(entity_id), self._COLUMNS)
 
         # Если в БД есть запись по указанному ID
         if row:
-            # Получить специальность студента
-            speciality_id = row[4]
-            speciality = self.speciality_dao.find_by_id(speciality_id)
-
-            entity = Student(student_id=row[0],
-                             name=row[1],
-                             age=row[2],
-                             sex=row[3],
-                             speciality=speciality)
+            entity = self.__to_entity(row)
         return entity
 
-    def find_all(self):
+    def find_all(self, columns=None, as_=None):
+        """
+        Метод возвращает всех студентов. Если указаны колонки или тип строк - возвращает проекцию:
+        только указанные колонки, без создания сущностей \n
+        :param columns: имена колонок, напр. ["id", "name"]. По-умолчанию - все колонки
+        :param as_: тип строк проекции: "tuple" | "namedtuple"
+        :return: [] сущностей Student или строк проекции
+        """
+        if columns is None and as_ is None:
+            return self.__to_entities(self.__find_all(self._SQL_FIND_ALL, fields=self._COLUMNS))
+
+        sql, columns = super()._projection_sql(columns, as_ or "tuple")
+        rows = self.__find_all(sql, key=self.__id_key(columns))
+        return list(map(_row_type(columns)._make, rows)) if as_ == "namedtuple" else rows
+
+    def find_by_speciality(self, speciality_id):
+        """
+        Метод возвращает всех студентов указанной специальности \n
+        :param speciality_id: ИД специальности
+        :return: []
+        """
+        return self.__to_entities(self.__find_all(self._SQL_FIND_BY_SPECIALITY, (speciality_id,),
+                                                  fields=self._COLUMNS))
+
+    def __find_all(self, sql, params=(), fields=None, key=itemgetter(0)):
+        # Записи могут находиться в любом шарде (ИД, указанный явно, определяет шард) - опросить все
+        if self.sharded:
+            return super()._scatter_find_all(sql, params, key, fields)
+        return super()._find_all(sql, params, fields=fields)
+
+    @staticmethod
+    def __id_key(columns):
+        # Без колонки id порядок записей из разных шардов не восстановить
+        return itemgetter(columns.index("id")) if "id" in columns else None
+
+    def __to_entities(self, records):
         entities = []
-        records = super()._find_all(self._SQL_FIND_ALL)
 
         # Обработать результаты поиска записей в БД
         if records:
             for record in records:
-
-                # Получить специальность студента
-                speciality_id = record[4]
-                speciality = self.speciality_dao.find_by_id(speciality_id)
-
                 # Добавить сущность студента в результ. список записей
-                student = Student(student_id=record[0],
-                                  name=record[1],
-                                  age=record[2],
-                                  sex=record[3],
-                                  speciality=speciality)
-                entities.append(student)
+                entities.append(self.__to_entity(record))
 
         return entities
 
+    def __to_entity(self, record):
+        # Получить специальность студента (значения колонок записи - в порядке _COLUMNS)
+        speciality_id = record[4]
+        speciality = self.speciality_dao.find_by_id(speciality_id)
+
+        return Student(student_id=record[0],
+                       name=record[1],
+                       age=record[2],
+                       sex=record[3],
+                       speciality=speciality)
+
     def save(self, entity):
         if not (isinstance(entity, Student)):
             raise TypeError("Неверный тип сущности для работы с БД: [{0}].".format(type(entity)))
 
-        row_id = super()._save(self._SQL_INSERT, entity.dict)
+        params = entity.dict
+        shard = None
+
+        # Выбрать шард по ключу шардирования и выделить глобально уникальный ИД
+        if self.sharded:
+            shard = ShardedSqliteConnectionManager.shard_for(params)
+            params["id"] = ShardedSqliteConnectionManager.allocate_id(shard, params["id"])
+
+        row_id = super()._save(self._SQL_INSERT, params, shard)
         entity.id = row_id
         return entity
 
 
 class SpecialitySqlDataMapper(IDataMapper, AbstractSqlDataMapper):
     """
-    Класс для получения данных из таблицы БД Speciality
+    Класс для получения данных из таблицы БД Speciality \n
+    В шардированной БД таблица-справочник реплицируется во все шарды: запись - во все, чтение - из шарда 0
     """
-    def __init__(self):
+    _COLUMNS = ("id", "name", "description", "code")
+
+    def __init__(self, database=Databases.SQLITE):
+        self.__database = database
         self._SQL_UPDATE = """\
             UPDATE Speciality \
             SET name = :name, description = :description, code = :code \
@@ -264,24 +713,36 @@ class SpecialitySqlDataMapper(IDataMapper, AbstractSqlDataMapper):
 
     @property
     def database(self):
-        return Databases.SQLITE
+        return self.__database
+
+    @property
+    def table(self):
+        return "Speciality"
+
+    @property
+    def sharded(self):
+        return self.__database == Databases.SQLITE_SHARDED
 
     # Обновление записи
     def update(self, entity):
         if not (isinstance(entity, Speciality)):
             raise TypeError("Неверный тип сущности для работы с БД: [{0}].".format(type(entity)))
 
+        if self.sharded:
+            return super()._replicate_update(self._SQL_UPDATE, entity.dict)
         return super()._update(self._SQL_UPDATE, entity.dict)
 
     # Удаление записи
     def delete(self, entity_id):
+        if self.sharded:
+            return super()._replicate_delete(self._SQL_DELETE, (entity_id,))
         return super()._delete(self._SQL_DELETE, (entity_id,))
 
     # Поиск по ID
     def find_by_id(self, entity_id):
 
         entity = None
-        row = super()._find_by_id(self._SQL_FIND_ONE, (entity_id,))
+        row = super()._find_by_id(self._SQL_FIND_ONE, (entity_id,), fields=self._COLUMNS)
 
         if row is None:
             print("В БД не найден объект с ID='{0}'".format(entity_id))
@@ -291,11 +752,15 @@ class SpecialitySqlDataMapper(IDataMapper, AbstractSqlDataMapper):
 
         return entity
 
-    # Поиск всех записей
-    def find_all(self):
+    # Поиск всех записей (или проекции - только указанных колонок, без создания сущностей)
+    def find_all(self, columns=None, as_=None):
+        if columns is not None or as_ is not None:
+            sql, columns = super()._projection_sql(columns, as_ or "tuple")
+            rows = super()._find_all(sql)
+            return list(map(_row_type(columns)._make, rows)) if as_ == "namedtuple" else rows
 
         entities = []
-        records = super()._find_all(self._SQL_FIND_ALL)
+        records = super()._find_all(self._SQL_FIND_ALL, fields=self._COLUMNS)
 
         # Обработать результаты поиска записей в БД
         if records:
@@ -309,7 +774,10 @@ class SpecialitySqlDataMapper(IDataMapper, AbstractSqlDataMapper):
         if not (isinstance(entity, Speciality)):
             raise TypeError("Неверный тип сущности для работы с БД: [{0}].".format(type(entity)))
 
-        row_id = super()._save(self._SQL_INSERT, entity.dict)
+        if self.sharded:
+            row_id = super()._replicate_save(self._SQL_INSERT, entity.dict)
+        else:
+            row_id = super()._save(self._SQL_INSERT, entity.dict)
         entity.id = row_id
         print("В БД добавлен объект: {0}".format(entity))
         return entity
@@ -0,0 +1,111 @@
+import json
+import os
+
+from array import array
+
+from db.dao import StudentSqlDataMapper
+from utils.db import Databases
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _check_numpy():
+    if numpy is None:
+        raise ImportError("Для работы со снимками таблицы Student требуется пакет numpy")
+
+
+class StudentSnapshot:
+    """
+    Колоночный снимок таблицы Student для аналитики: каждая колонка хранится в отдельном файле .npy
+    и отображается в память (numpy.memmap) без копирования. \n
+    Колонки: id, age, speciality_id - числа фиксированной ширины, sex - коды словаря sex_dictionary
+    """
+    _META_FILE = "meta.json"
+
+    # Колонка -> (тип numpy, тип array для накопления значений при выгрузке)
+    _NUMERIC_COLUMNS = {
+        "id": ("int64", "q"),
+        "age": ("int32", "l"),
+        "speciality_id": ("int64", "q")
+    }
+    _SEX_COLUMN = ("sex_codes", "uint8", "B")
+
+    def __init__(self, directory):
+        """
+        Загрузка снимка (файлы колонок отображаются в память только для чтения) \n
+        :param directory: каталог снимка
+        """
+        _check_numpy()
+        with open(os.path.join(directory, self._META_FILE), encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+
+        self.rows = meta["rows"]
+        self.sex_dictionary = meta["sex_dictionary"]
+        self.id = self.__load_column(directory, "id")
+        self.age = self.__load_column(directory, "age")
+        self.speciality_id = self.__load_column(directory, "speciality_id")
+        self.sex_codes = self.__load_column(directory, self._SEX_COLUMN[0])
+
+    def __load_column(self, directory, column):
+        values = numpy.load(os.path.join(directory, column + ".npy"), mmap_mode="r")
+        if len(values) != self.rows:
+            raise ValueError("Снимок поврежден: в колонке '{0}' {1} значений вместо {2}".format(
+                column, len(values), self.rows))
+        return values
+
+    def __len__(self):
+        return self.rows
+
+    def sex_code(self, sex):
+        """
+        Метод возвращает код значения пола в колонке sex_codes \n
+        :param sex: значение пола, напр. "М"
+        :return: код или None, если значение в снимке не встречается
+        """
+        return self.sex_dictionary.index(sex) if sex in self.sex_dictionary else None
+
+    @classmethod
+    def export(cls, directory, database=Databases.SQLITE):
+        """
+        Метод выгружает таблицу Student в колоночный снимок. Файлы существующего снимка заменяются
+        по одному, файл описания (meta.json) - последним \n
+        :param directory: каталог снимка (создается при отсутствии)
+        :param database: БД, из которой выгружаются данные
+        :return: загруженный снимок StudentSnapshot
+        """
+        _check_numpy()
+        os.makedirs(directory, exist_ok=True)
+
+        columns = {column: array(typecode) for column, (_, typecode) in cls._NUMERIC_COLUMNS.items()}
+        sex_codes, sex_dictionary = array(cls._SEX_COLUMN[2]), {}
+
+        # Значения накапливаются в компактных массивах array, без создания сущностей Student
+        for student_id, age, sex, speciality_id in StudentSqlDataMapper(database).iter_columns(
+                ["id", "age", "sex", "speciality_id"]):
+            columns["id"].append(student_id)
+            columns["age"].append(int(age))
+            columns["speciality_id"].append(speciality_id)
+            sex_codes.append(sex_dictionary.setdefault(sex, len(sex_dictionary)))
+
+        for column, (dtype, _) in cls._NUMERIC_COLUMNS.items():
+            cls.__save_column(directory, column, numpy.asarray(columns[column], dtype=dtype))
+        cls.__save_column(directory, cls._SEX_COLUMN[0], numpy.asarray(sex_codes, dtype=cls._SEX_COLUMN[1]))
+
+        meta = {"rows": len(sex_codes), "sex_dictionary": sorted(sex_dictionary, key=sex_dictionary.get)}
+        meta_path = os.path.join(directory, cls._META_FILE)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as meta_file:
+            json.dump(meta, meta_file, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+
+        print("Выгружен снимок таблицы Student: {0} записей [{1}]".format(meta["rows"], directory))
+        return cls(directory)
+
+    @staticmethod
+    def __save_column(directory, column, values):
+        path = os.path.join(directory, column + ".npy")
+        with open(path + ".tmp", "wb") as column_file:
+            numpy.save(column_file, values)
+        os.replace(path + ".tmp", path)
@@ -72,3 +72,35 @@ class Speciality(Entity):
                     self.code == other.code
         else:
             return False
+
+
+class Change(Entity):
+    """
+    Класс домена - запись журнала изменений (версия, тип операции, ИД измененной записи)
+    """
+    INSERT = "I"
+    UPDATE = "U"
+    DELETE = "D"
+
+    def __init__(self, version=None, op=None, entity_id=None):
+        self.version = version
+        self.op = op
+        self.entity_id = entity_id
+
+    @property
+    def dict(self):
+        return {"version": self.version,
+                "op": self.op,
+                "entity_id": self.entity_id}
+
+    def __str__(self):
+        return "Change:" + str(self.dict)
+
+    def __lt__(self, other):
+        return self.version < other.version
+
+    def __eq__(self, other):
+        if type(self) is type(other):
+            return self.version == other.version and self.op == other.op and self.entity_id == other.entity_id
+        else:
+            return False
@@ -5,3 +5,30 @@ _PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
 # Исп. БД
 SQLITE_CONNECTION_STR = os.path.join(_PROJECT_ROOT, "studentsdb.db")
+
+# Скрипты создания структуры БД (sqlite)
+SQLITE_CREATE_SCRIPT = os.path.join(_PROJECT_ROOT, "resources", "sqlite-db", "db-create.sql")
+SQLITE_CREATE_SHARD_SCRIPT = os.path.join(_PROJECT_ROOT, "resources", "sqlite-db", "db-create-shard.sql")
+
+# Скрипты создания и перестроения полнотекстового индекса имен студентов (FTS5)
+SQLITE_CREATE_FTS_SCRIPT = os.path.join(_PROJECT_ROOT, "resources", "sqlite-db", "db-create-fts.sql")
+SQLITE_REBUILD_FTS_SCRIPT = os.path.join(_PROJECT_ROOT, "resources", "sqlite-db", "db-rebuild-fts.sql")
+
+# Скрипт создания журнала изменений (CDC) таблиц Student и Speciality
+SQLITE_CREATE_CHANGELOG_SCRIPT = os.path.join(_PROJECT_ROOT, "resources", "sqlite-db", "db-create-changelog.sql")
+
+# Шарды БД (sqlite): записи Student распределяются по файлам, Speciality - реплицируется во все
+SQLITE_SHARDS_COUNT = 4
+SQLITE_SHARD_CONNECTION_STRS = [
+    os.path.join(_PROJECT_ROOT, "studentsdb-shard-{0}.db".format(shard)) for shard in range(SQLITE_SHARDS_COUNT)
+]
+
+# Ключ шардирования новых записей Student: "speciality_id" | "id"
+SQLITE_SHARD_KEY = "speciality_id"
+
+# Режим БД в памяти (sqlite): копия studentsdb.db загружается в :memory: при старте
+# Запись на диск: "sync" - синхронно с каждой операцией | "periodic" - периодическим резервным копированием
+SQLITE_MEMORY_DURABILITY = "sync"
+# Интервал (сек.) и размер шага (кол-во страниц) периодического копирования БД на диск
+SQLITE_MEMORY_BACKUP_INTERVAL = 5.0
+SQLITE_MEMORY_BACKUP_PAGES = 256
@@ -0,0 +1,47 @@
+CREATE TABLE IF NOT EXISTS ChangeLog(
+  version integer PRIMARY KEY AUTOINCREMENT,
+  table_name text NOT NULL,
+  op text NOT NULL,
+  row_id integer NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ChangeLog_table_version ON ChangeLog(table_name, version);
+
+CREATE TABLE IF NOT EXISTS ChangeLogCompaction(
+  table_name text PRIMARY KEY,
+  version integer NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Student_insert AFTER INSERT ON Student BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Student', 'I', new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Student_update AFTER UPDATE ON Student WHEN old.id = new.id BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Student', 'U', new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Student_update_id AFTER UPDATE OF id ON Student WHEN old.id <> new.id BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Student', 'D', old.id);
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Student', 'I', new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Student_delete AFTER DELETE ON Student BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Student', 'D', old.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Speciality_insert AFTER INSERT ON Speciality BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Speciality', 'I', new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Speciality_update AFTER UPDATE ON Speciality WHEN old.id = new.id BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Speciality', 'U', new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Speciality_update_id AFTER UPDATE OF id ON Speciality WHEN old.id <> new.id BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Speciality', 'D', old.id);
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Speciality', 'I', new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS ChangeLog_Speciality_delete AFTER DELETE ON Speciality BEGIN
+  INSERT INTO ChangeLog(table_name, op, row_id) VALUES ('Speciality', 'D', old.id);
+END;
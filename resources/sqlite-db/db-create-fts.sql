@@ -0,0 +1,21 @@
+CREATE VIRTUAL TABLE IF NOT EXISTS StudentNameIndex USING fts5(
+  name,
+  content = '',
+  tokenize = 'unicode61 remove_diacritics 0',
+  prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS StudentNameIndex_insert AFTER INSERT ON Student BEGIN
+  INSERT INTO StudentNameIndex(rowid, name) VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS StudentNameIndex_delete AFTER DELETE ON Student BEGIN
+  INSERT INTO StudentNameIndex(StudentNameIndex, rowid, name)
+  VALUES ('delete', old.id, replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS StudentNameIndex_update AFTER UPDATE OF id, name ON Student BEGIN
+  INSERT INTO StudentNameIndex(StudentNameIndex, rowid, name)
+  VALUES ('delete', old.id, replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'));
+  INSERT INTO StudentNameIndex(rowid, name) VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'));
+END;
@@ -0,0 +1,4 @@
+CREATE TABLE IF NOT EXISTS ShardSequence(
+  shard integer PRIMARY KEY,
+  seq integer NOT NULL
+);
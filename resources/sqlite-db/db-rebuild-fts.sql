@@ -0,0 +1,4 @@
+BEGIN;
+INSERT INTO StudentNameIndex(StudentNameIndex) VALUES ('delete-all');
+INSERT INTO StudentNameIndex(rowid, name) SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM Student;
+COMMIT;
@@ -0,0 +1,105 @@
+import threading
+import unittest
+
+from domain.entities import Speciality, Student
+from db.dao import SpecialitySqlDataMapper, StudentSqlDataMapper
+from utils.db import Databases, MemorySqliteConnectionManager
+
+
+class TestMemoryStudent(unittest.TestCase):
+    """
+    Тесты, проверяющие работу с копией БД в памяти и запись изменений на диск
+    """
+    def setUp(self):
+        self.disk_dao = StudentSqlDataMapper()
+        self.memory_dao = StudentSqlDataMapper(Databases.SQLITE_MEMORY)
+        self.speciality = SpecialitySqlDataMapper().save(Speciality(name="Право"))
+        self.added_students = []
+
+    def tearDown(self):
+        MemorySqliteConnectionManager.shutdown()
+
+        # Удалить тестовые записи
+        for student in self.added_students:
+            self.disk_dao.delete(student.id)
+        SpecialitySqlDataMapper().delete(self.speciality.id)
+
+    def test_should_ReadFromMemory(self):
+        MemorySqliteConnectionManager.startup("sync")
+        student = self.disk_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.speciality))
+        self.added_students.append(student)
+
+        # Запись, добавленная в файл после загрузки, не видна в копии БД в памяти
+        self.assertIsNone(self.memory_dao.find_by_id(student.id))
+
+    def test_should_WriteThroughSync(self):
+        MemorySqliteConnectionManager.startup("sync")
+        student = self.memory_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.speciality))
+        self.added_students.append(student)
+
+        self.assertEqual(self.memory_dao.find_by_id(student.id), student)
+        self.assertEqual(self.disk_dao.find_by_id(student.id), student)
+
+        student.name = "Петров П.П."
+        self.assertEqual(self.memory_dao.update(student), 1)
+        self.assertEqual(self.disk_dao.find_by_id(student.id).name, "Петров П.П.")
+
+    def test_should_WriteOnCheckpoint(self):
+        MemorySqliteConnectionManager.startup("periodic", interval=3600)
+        student = self.memory_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.speciality))
+        self.added_students.append(student)
+        self.assertIsNone(self.disk_dao.find_by_id(student.id))
+
+        MemorySqliteConnectionManager.shutdown()
+        self.assertEqual(self.disk_dao.find_by_id(student.id), student)
+
+    def test_shouldNot_BlockWhileStreaming(self):
+        MemorySqliteConnectionManager.startup("sync")
+        student = self.memory_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.speciality))
+        self.added_students.append(student)
+
+        rows = self.memory_dao.iter_columns(["id"])
+        next(rows)
+
+        # Поиск в другом потоке не ждет окончания чтения потока записей
+        found = []
+        reader = threading.Thread(target=lambda: found.append(self.memory_dao.find_by_id(student.id)))
+        reader.start()
+        reader.join(5)
+        self.assertEqual(found, [student])
+
+        # Чтение потока записей можно продолжить в другом потоке
+        rest = []
+        consumer = threading.Thread(target=lambda: rest.extend(rows))
+        consumer.start()
+        consumer.join(5)
+        self.assertIn((student.id,), rest)
+
+    def test_shouldNot_DeadlockOnRestart(self):
+        MemorySqliteConnectionManager.startup("periodic", interval=0.01)
+        student = self.memory_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.speciality))
+        self.added_students.append(student)
+
+        restart = threading.Thread(target=MemorySqliteConnectionManager.startup, args=("sync",))
+        with MemorySqliteConnectionManager().lock():
+            restart.start()
+            restart.join(0.5)
+        restart.join(5)
+        self.assertFalse(restart.is_alive())
+        self.assertEqual(self.disk_dao.find_by_id(student.id), student)
+
+    def test_shouldNot_DeadlockOnCheckpointWhileConnecting(self):
+        MemorySqliteConnectionManager.shutdown()
+
+        # Копирование (checkpoint) удерживает _checkpoint_lock и ожидает соединение с БД,
+        # первое подключение в это время загружает БД в память
+        with MemorySqliteConnectionManager._checkpoint_lock:
+            connect = threading.Thread(target=MemorySqliteConnectionManager)
+            connect.start()
+            connect.join(0.5)
+            acquired = MemorySqliteConnectionManager._lock.acquire(timeout=2)
+            if acquired:
+                MemorySqliteConnectionManager._lock.release()
+        connect.join(5)
+        self.assertTrue(acquired)
+        self.assertFalse(connect.is_alive())
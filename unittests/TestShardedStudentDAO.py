@@ -0,0 +1,166 @@
+import unittest
+
+from domain.entities import Speciality, Student
+from db.dao import SpecialitySqlDataMapper, StudentSqlDataMapper
+from utils.db import ConnectionManager, Databases, ShardedSqliteConnectionManager
+from utils.exceptions import DAOException
+
+
+class TestShardedStudent(unittest.TestCase):
+    """
+    Тесты, проверяющие работу с записями в шардированной БД
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.speciality_dao = SpecialitySqlDataMapper(Databases.SQLITE_SHARDED)
+        cls.student_dao = StudentSqlDataMapper(Databases.SQLITE_SHARDED)
+        cls.test_specialities = [
+            cls.speciality_dao.save(Speciality(name="Право")),
+            cls.speciality_dao.save(Speciality(name="Кибернетика"))
+        ]
+        cls.test_students = [
+            cls.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=speciality))
+            for speciality in cls.test_specialities for _ in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+
+        # Удалить тестовые записи студентов
+        for student in cls.test_students:
+            cls.student_dao.delete(student.id)
+
+        # Удалить тестовые записи специальностей
+        for speciality in cls.test_specialities:
+            cls.speciality_dao.delete(speciality.id)
+
+    def test_should_ReplicateSpeciality(self):
+        speciality = self.test_specialities[0]
+        for shard in ShardedSqliteConnectionManager.shards():
+            connect_manager = ConnectionManager.factory(Databases.SQLITE_SHARDED, shard)
+            row = connect_manager.get_connection().execute("SELECT name FROM Speciality WHERE id = ?",
+                                                           (speciality.id,)).fetchone()
+            connect_manager.close_connection()
+            self.assertEqual(row, (speciality.name,))
+
+    def test_should_AllocateUniqueIds(self):
+        ids = [student.id for student in self.test_students]
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_should_PlaceBySpeciality(self):
+        for student in self.test_students:
+            self.assertEqual(ShardedSqliteConnectionManager.shard_of(student.id),
+                             ShardedSqliteConnectionManager.shard_of(student.speciality.id))
+
+    def test_should_FindEntity(self):
+        last_student = max(self.test_students)
+        student = self.student_dao.find_by_id(last_student.id)
+        self.assertEqual(student, last_student)
+
+    def test_should_FindAllEntities(self):
+        records = self.student_dao.find_all()
+        self.assertEqual(records, sorted(records))
+        for student in self.test_students:
+            self.assertIn(student, records)
+
+    def test_should_FindBySpeciality(self):
+        speciality = self.test_specialities[1]
+        records = self.student_dao.find_by_speciality(speciality.id)
+        self.assertEqual(records, [student for student in self.test_students if student.speciality == speciality])
+
+    def test_should_UpdateEntity(self):
+        student = self.test_students[0]
+        updated_rows = self.student_dao.update(Student(student_id=student.id, name="Петров П.П.", age=19, sex="М",
+                                                       speciality=student.speciality))
+        self.assertEqual(updated_rows, 1)
+        self.assertEqual(self.student_dao.find_by_id(student.id).name, "Петров П.П.")
+        self.student_dao.update(student)
+
+    def test_should_SearchByName(self):
+        students = list(self.student_dao.search_by_name("иванов"))
+        for student in self.test_students:
+            self.assertIn(student, students)
+
+    def test_should_FindProjection(self):
+        rows = self.student_dao.find_all(columns=["name", "id"], as_="tuple")
+        self.assertEqual([row[1] for row in rows], sorted(row[1] for row in rows))
+        for student in self.test_students:
+            self.assertIn((student.name, student.id), rows)
+
+
+class TestShardedSpecialityReplication(unittest.TestCase):
+    """
+    Тесты, проверяющие отмену изменений справочника при ошибке записи в один из шардов
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.speciality_dao = SpecialitySqlDataMapper(Databases.SQLITE_SHARDED)
+        cls.test_speciality = cls.speciality_dao.save(Speciality(name="Право"))
+        cls.failing_shard = ShardedSqliteConnectionManager.shards()[-1]
+
+        # Запретить изменения с именем "Ошибка" в последнем шарде
+        cls.__execute_on_failing_shard("""\
+            CREATE TRIGGER IF NOT EXISTS TestFail_insert BEFORE INSERT ON Speciality WHEN new.name = 'Ошибка' BEGIN
+              SELECT RAISE(ABORT, 'test');
+            END;
+            CREATE TRIGGER IF NOT EXISTS TestFail_update BEFORE UPDATE ON Speciality WHEN new.name = 'Ошибка' BEGIN
+              SELECT RAISE(ABORT, 'test');
+            END;
+            CREATE TRIGGER IF NOT EXISTS TestFail_delete BEFORE DELETE ON Speciality WHEN old.code = 'Ошибка' BEGIN
+              SELECT RAISE(ABORT, 'test');
+            END;
+            """)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.__execute_on_failing_shard("""\
+            DROP TRIGGER TestFail_insert;
+            DROP TRIGGER TestFail_update;
+            DROP TRIGGER TestFail_delete;
+            """)
+        cls.speciality_dao.delete(cls.test_speciality.id)
+
+    @classmethod
+    def __execute_on_failing_shard(cls, script):
+        connect_manager = ConnectionManager.factory(Databases.SQLITE_SHARDED, cls.failing_shard)
+        connect_manager.get_connection().executescript(script)
+        connect_manager.close_connection()
+
+    @staticmethod
+    def __replicas(speciality_id):
+        rows = []
+        for shard in ShardedSqliteConnectionManager.shards():
+            connect_manager = ConnectionManager.factory(Databases.SQLITE_SHARDED, shard)
+            rows.append(connect_manager.get_connection().execute(
+                "SELECT name, code FROM Speciality WHERE id = ?", (speciality_id,)).fetchone())
+            connect_manager.close_connection()
+        return rows
+
+    def test_should_UndoSaveOnFailure(self):
+        speciality = Speciality(name="Ошибка")
+        with self.assertRaises(DAOException):
+            self.speciality_dao.save(speciality)
+
+        connect_manager = ConnectionManager.factory(Databases.SQLITE_SHARDED, 0)
+        row = connect_manager.get_connection().execute(
+            "SELECT max(id) FROM Speciality WHERE name = 'Ошибка'").fetchone()
+        connect_manager.close_connection()
+        self.assertEqual(row, (None,))
+
+    def test_should_UndoUpdateOnFailure(self):
+        with self.assertRaises(DAOException):
+            self.speciality_dao.update(Speciality(sp_id=self.test_speciality.id, name="Ошибка"))
+        self.assertEqual(self.__replicas(self.test_speciality.id),
+                         [(self.test_speciality.name, None)] * ShardedSqliteConnectionManager.shards_count())
+
+    def test_should_UndoDeleteOnFailure(self):
+        speciality = self.speciality_dao.save(Speciality(name="Кибернетика", code="Ошибка"))
+        with self.assertRaises(DAOException):
+            self.speciality_dao.delete(speciality.id)
+        self.assertEqual(self.__replicas(speciality.id),
+                         [("Кибернетика", "Ошибка")] * ShardedSqliteConnectionManager.shards_count())
+
+        # Удалить тестовую запись: снять запрет удаления
+        speciality.code = None
+        self.speciality_dao.update(speciality)
+        self.speciality_dao.delete(speciality.id)
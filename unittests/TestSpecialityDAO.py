@@ -85,6 +85,11 @@ class TestSpecialityFind(unittest.TestCase):
         self.assertIsNotNone(records)
         self.assertGreater(len(records), 0)
 
+    def test_should_findProjection(self):
+        rows = self.dao.find_all(columns=["id", "code"], as_="namedtuple")
+        for entity in self.test_entities:
+            self.assertIn((entity.id, entity.code), rows)
+
 
 class TestSpecialityRemove(unittest.TestCase):
     """
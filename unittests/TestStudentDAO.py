@@ -1,8 +1,9 @@
 import unittest
 import copy
 
-from domain.entities import Speciality, Student
+from domain.entities import Change, Speciality, Student
 from db.dao import SpecialitySqlDataMapper, StudentSqlDataMapper
+from utils.exceptions import DAOException
 
 
 class TestStudentSave(unittest.TestCase):
@@ -119,6 +120,28 @@ class TestStudentFind(unittest.TestCase):
         self.assertIsNotNone(student)
         self.assertEqual(student, last_student)
 
+    def test_should_FindEntitiesByColumnNames(self):
+        dao = StudentSqlDataMapper()
+        dao._SQL_FIND_ALL = "SELECT speciality_id, sex, age, name, id from Student"
+        self.assertEqual(dao.find_all(), self.student_dao.find_all())
+
+    def test_should_IterColumns(self):
+        rows = list(self.student_dao.iter_columns(["id", "name"]))
+        for student in self.test_students:
+            self.assertIn((student.id, student.name), rows)
+        self.assertEqual(rows, sorted(rows))
+
+    def test_should_IterColumnsInBatches(self):
+        dao = StudentSqlDataMapper()
+        dao._BATCH_SIZE = 2
+        rows = list(dao.iter_columns(["name"], as_="namedtuple"))
+        expected = sorted(self.student_dao.find_all(columns=["id", "name"]))
+        self.assertEqual([row.name for row in rows], [name for _, name in expected])
+
+    def test_shouldNot_IterUnknownColumns(self):
+        with self.assertRaises(ValueError):
+            self.student_dao.iter_columns(["id", "password"])
+
     def test_should_FindEntityWithoutSpec(self):
         first_student = min(self.test_students)
         student_wo_spec = self.student_dao.find_by_id(first_student.id)
@@ -126,3 +149,202 @@ class TestStudentFind(unittest.TestCase):
         # self.assertEqual(student_wo_spec, first_student)
         self.assertIsNone(student_wo_spec.speciality)
 
+
+class TestStudentSearch(unittest.TestCase):
+    """
+    Тесты, проверяющие полнотекстовый поиск студентов по имени
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.speciality_dao = SpecialitySqlDataMapper()
+        cls.student_dao = StudentSqlDataMapper()
+        cls.test_speciality = cls.speciality_dao.save(Speciality(name="Право"))
+        cls.test_students = [
+            cls.student_dao.save(Student(name="Тестовый Фёдор Ильич", age=19, sex="М", speciality=cls.test_speciality)),
+            cls.student_dao.save(Student(name="Тестовая Анна Тестовна", age=18, sex="Ж",
+                                         speciality=cls.test_speciality)),
+            cls.student_dao.save(Student(name="Тестов-Тестович Иван", age=20, sex="М", speciality=cls.test_speciality))
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+
+        # Удалить тестовые записи студентов
+        for student in cls.test_students:
+            cls.student_dao.delete(student.id)
+
+        # Удалить тестовые записи специальностей
+        cls.speciality_dao.delete(cls.test_speciality.id)
+
+    def test_should_FindByPrefixIgnoringCase(self):
+        students = list(self.student_dao.search_by_name("ТЕСТОВ"))
+        self.assertEqual(sorted(students), self.test_students)
+
+    def test_should_FindByAllWords(self):
+        students = list(self.student_dao.search_by_name("тестов фед"))
+        self.assertEqual(students, [self.test_students[0]])
+
+    def test_should_FoldYo(self):
+        students = list(self.student_dao.search_by_name("федор"))
+        self.assertEqual(students, [self.test_students[0]])
+
+    def test_should_RankByRelevance(self):
+        students = list(self.student_dao.search_by_name("тестов"))
+        self.assertEqual(students[0], self.test_students[1])
+
+    def test_should_LimitResults(self):
+        students = list(self.student_dao.search_by_name("тестов", limit=2))
+        self.assertEqual(len(students), 2)
+
+    def test_should_FindAfterUpdate(self):
+        student = self.test_students[2]
+        self.student_dao.update(Student(student_id=student.id, name="Переименованный И.", age=student.age,
+                                        sex=student.sex, speciality=student.speciality))
+        self.assertEqual([s.id for s in self.student_dao.search_by_name("переимен")], [student.id])
+        self.assertNotIn(student.id, [s.id for s in self.student_dao.search_by_name("иван")])
+        self.student_dao.update(student)
+
+    def test_should_ReadInBatches(self):
+        dao = StudentSqlDataMapper()
+        dao._BATCH_SIZE = 2
+        students = list(dao.search_by_name("тестов"))
+        self.assertEqual(students, list(self.student_dao.search_by_name("тестов")))
+        self.assertEqual(len(students), 3)
+
+    def test_should_RebuildIndex(self):
+        self.student_dao.rebuild_name_index()
+        students = list(self.student_dao.search_by_name("ТЕСТОВ"))
+        self.assertEqual(sorted(students), self.test_students)
+
+    def test_shouldNot_FindByEmptyQuery(self):
+        self.assertEqual(list(self.student_dao.search_by_name("  ")), [])
+
+    def test_shouldNot_FailOnSyntaxChars(self):
+        self.assertEqual(list(self.student_dao.search_by_name('"OR* NEAR(')), [])
+
+
+class TestStudentChanges(unittest.TestCase):
+    """
+    Тесты, проверяющие журнал изменений записей студентов
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.speciality_dao = SpecialitySqlDataMapper()
+        cls.student_dao = StudentSqlDataMapper()
+        cls.student_dao.enable_change_log()
+        cls.test_speciality = cls.speciality_dao.save(Speciality(name="Право"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.speciality_dao.delete(cls.test_speciality.id)
+
+    def test_should_LogChangesInOrder(self):
+        version = self.student_dao.get_last_change_version()
+        student = self.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.test_speciality))
+        student.age = 19
+        self.student_dao.update(student)
+        self.student_dao.delete(student.id)
+
+        changes = list(self.student_dao.get_changes_since(version))
+        self.assertEqual([(change.op, change.entity_id) for change in changes],
+                         [(Change.INSERT, student.id), (Change.UPDATE, student.id), (Change.DELETE, student.id)])
+        self.assertEqual(changes, sorted(changes))
+        self.assertGreater(changes[0].version, version)
+        self.assertEqual(self.student_dao.get_last_change_version(), changes[-1].version)
+
+    def test_should_LimitChanges(self):
+        version = self.student_dao.get_last_change_version()
+        student = self.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.test_speciality))
+        self.student_dao.delete(student.id)
+
+        changes = list(self.student_dao.get_changes_since(version, limit=1))
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].op, Change.INSERT)
+
+    def test_should_CompactChanges(self):
+        student = self.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.test_speciality))
+        self.student_dao.delete(student.id)
+        version = self.student_dao.get_last_change_version()
+
+        self.assertGreater(self.student_dao.compact_changes(version - 1), 0)
+        self.assertEqual([change.version for change in self.student_dao.get_changes_since(version - 1)], [version])
+        with self.assertRaises(DAOException):
+            list(self.student_dao.get_changes_since(version - 2))
+
+    def test_should_BootstrapAfterFullCompaction(self):
+        student = self.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.test_speciality))
+        self.student_dao.delete(student.id)
+        version = self.student_dao.get_last_change_version()
+
+        self.assertGreater(self.student_dao.compact_changes(version), 0)
+        self.assertEqual(self.student_dao.get_last_change_version(), version)
+        self.assertEqual(list(self.student_dao.get_changes_since(self.student_dao.get_last_change_version())), [])
+
+    def test_should_ClampCompactionToLastChange(self):
+        version = self.student_dao.get_last_change_version()
+        self.student_dao.compact_changes(version + 10 ** 6)
+        self.assertEqual(self.student_dao.get_last_change_version(), version)
+
+        student = self.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=self.test_speciality))
+        self.student_dao.delete(student.id)
+        changes = list(self.student_dao.get_changes_since(self.student_dao.get_last_change_version() - 1))
+        self.assertEqual([(change.op, change.entity_id) for change in changes], [(Change.DELETE, student.id)])
+
+    def test_shouldNot_MissChangesCompactedWhileReading(self):
+        version = self.student_dao.get_last_change_version()
+        for _ in range(2):
+            student = self.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М",
+                                                    speciality=self.test_speciality))
+            self.student_dao.delete(student.id)
+
+        dao = StudentSqlDataMapper()
+        dao._BATCH_SIZE = 1
+        changes = dao.get_changes_since(version)
+        next(changes)
+
+        # Журнал сжат после чтения первой порции: чтение следующей порции должно сообщить о пропуске изменений
+        self.student_dao.compact_changes(self.student_dao.get_last_change_version())
+        with self.assertRaises(DAOException):
+            next(changes)
+
+
+class TestStudentProjection(unittest.TestCase):
+    """
+    Тесты, проверяющие выборку только указанных колонок (проекцию) без создания сущностей
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.speciality_dao = SpecialitySqlDataMapper()
+        cls.student_dao = StudentSqlDataMapper()
+        cls.test_speciality = cls.speciality_dao.save(Speciality(name="Право"))
+        cls.test_student = cls.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М",
+                                                        speciality=cls.test_speciality))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.student_dao.delete(cls.test_student.id)
+        cls.speciality_dao.delete(cls.test_speciality.id)
+
+    def test_should_FindTuples(self):
+        rows = self.student_dao.find_all(columns=["id", "name"], as_="tuple")
+        self.assertIn((self.test_student.id, self.test_student.name), rows)
+        self.assertEqual(len(rows), len(self.student_dao.find_all()))
+
+    def test_should_FindNamedTuples(self):
+        rows = self.student_dao.find_all(columns=["name", "age", "id"], as_="namedtuple")
+        row = next(row for row in rows if row.id == self.test_student.id)
+        self.assertEqual((row.name, row.age), (self.test_student.name, self.test_student.age))
+        self.assertEqual(row._fields, ("name", "age", "id"))
+
+    def test_should_FindAllColumns(self):
+        rows = self.student_dao.find_all(as_="namedtuple")
+        row = next(row for row in rows if row.id == self.test_student.id)
+        self.assertEqual(row._asdict(), self.test_student.dict)
+
+    def test_shouldNot_FindUnknownColumns(self):
+        with self.assertRaises(ValueError):
+            self.student_dao.find_all(columns=["id", "password"])
+
+    def test_shouldNot_FindAsUnknownType(self):
+        with self.assertRaises(ValueError):
+            self.student_dao.find_all(columns=["id"], as_="entity")
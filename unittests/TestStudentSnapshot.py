@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from domain.entities import Speciality, Student
+from db.dao import SpecialitySqlDataMapper, StudentSqlDataMapper
+from db.snapshot import StudentSnapshot, numpy
+
+
+@unittest.skipIf(numpy is None, "не установлен пакет numpy")
+class TestStudentSnapshot(unittest.TestCase):
+    """
+    Тесты, проверяющие выгрузку таблицы Student в колоночный снимок
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.speciality_dao = SpecialitySqlDataMapper()
+        cls.student_dao = StudentSqlDataMapper()
+        cls.test_speciality = cls.speciality_dao.save(Speciality(name="Право"))
+        cls.test_students = [
+            cls.student_dao.save(Student(name="Иванов И.И.", age=18, sex="М", speciality=cls.test_speciality)),
+            cls.student_dao.save(Student(name="Маркова А.И.", age=20, sex="Ж", speciality=cls.test_speciality))
+        ]
+        cls.directory = tempfile.mkdtemp()
+        cls.snapshot = StudentSnapshot.export(cls.directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.snapshot
+        shutil.rmtree(cls.directory)
+
+        # Удалить тестовые записи студентов
+        for student in cls.test_students:
+            cls.student_dao.delete(student.id)
+
+        # Удалить тестовые записи специальностей
+        cls.speciality_dao.delete(cls.test_speciality.id)
+
+    def test_should_ExportAllRows(self):
+        ids = [row[0] for row in self.student_dao.iter_columns(["id"])]
+        self.assertEqual(len(self.snapshot), len(ids))
+        self.assertEqual(self.snapshot.id.tolist(), ids)
+
+    def test_should_MapColumnsToMemory(self):
+        for column in (self.snapshot.id, self.snapshot.age, self.snapshot.speciality_id, self.snapshot.sex_codes):
+            self.assertIsInstance(column, numpy.memmap)
+            self.assertFalse(column.flags.writeable)
+
+    def test_should_ExportColumnValues(self):
+        student = self.test_students[1]
+        index = numpy.searchsorted(self.snapshot.id, student.id)
+        self.assertEqual(self.snapshot.age[index], student.age)
+        self.assertEqual(self.snapshot.speciality_id[index], student.speciality.id)
+        self.assertEqual(self.snapshot.sex_dictionary[self.snapshot.sex_codes[index]], student.sex)
+
+    def test_should_GroupBySex(self):
+        code = self.snapshot.sex_code("Ж")
+        females = numpy.count_nonzero(self.snapshot.sex_codes == code)
+        expected = sum(1 for row in self.student_dao.iter_columns(["sex"]) if row[0] == "Ж")
+        self.assertEqual(females, expected)
+        self.assertIsNone(self.snapshot.sex_code("?"))
+
+    def test_should_ReloadSnapshot(self):
+        snapshot = StudentSnapshot(self.directory)
+        self.assertEqual(snapshot.id.tolist(), self.snapshot.id.tolist())
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "meta.json")))
@@ -1,13 +1,46 @@
 import sqlite3
+import atexit
+import contextlib
+import itertools
+import threading
 
 from abc import abstractmethod, ABCMeta
 
-from properties import SQLITE_CONNECTION_STR
+from properties import SQLITE_CONNECTION_STR, SQLITE_CREATE_SCRIPT, SQLITE_CREATE_SHARD_SCRIPT, \
+    SQLITE_CREATE_FTS_SCRIPT, SQLITE_REBUILD_FTS_SCRIPT, SQLITE_SHARD_CONNECTION_STRS, SQLITE_SHARD_KEY, \
+    SQLITE_MEMORY_DURABILITY, SQLITE_MEMORY_BACKUP_INTERVAL, SQLITE_MEMORY_BACKUP_PAGES
 from domain.entities import Student, Speciality
 
 
+_initialized_databases = set()
+_init_lock = threading.Lock()
+
+
+def _init_database(connection, path, scripts=()):
+    """
+    Функция создает структуру БД при первом в процессе подключении к файлу БД: таблицы, полнотекстовый индекс
+    имен студентов (в существующей БД без индекса он заполняется по таблице Student) и доп. скрипты \n
+    :return: True - структура БД проверена при этом вызове, False - ранее
+    """
+    with _init_lock:
+        if path in _initialized_databases:
+            return False
+
+        has_name_index = connection.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'StudentNameIndex'").fetchone()[0] > 0
+        for script in (SQLITE_CREATE_SCRIPT, SQLITE_CREATE_FTS_SCRIPT) + tuple(scripts) + \
+                (() if has_name_index else (SQLITE_REBUILD_FTS_SCRIPT,)):
+            with open(script, encoding="utf-8") as script_file:
+                connection.executescript(script_file.read())
+
+        _initialized_databases.add(path)
+        return True
+
+
 class Databases:
     SQLITE = "sqlite"
+    SQLITE_SHARDED = "sqlite-sharded"
+    SQLITE_MEMORY = "sqlite-memory"
     MYSQL = "mysql"
 
 
@@ -31,12 +64,31 @@ class ConnectionManager(metaclass=ABCMeta):
         """
         pass
 
+    def write_through(self, sql, params=None, row_id=None):
+        """
+        Метод вызывается после выполнения изменяющего запроса (до фиксации транзакции).
+        Позволяет продублировать изменение в другом хранилище. По-умолчанию ничего не делает \n
+        :param sql: выполненный запрос
+        :param params: параметры запроса. None - sql является скриптом (executescript)
+        :param row_id: ИД записи, добавленной запросом (для запросов добавления)
+        """
+        pass
+
+    def lock(self):
+        """
+        Метод возвращает блокировку (контекстный менеджер), удерживаемую на время выполнения запроса
+        и чтения результата либо фиксации изменений. Нужна, если соединение общее для нескольких потоков.
+        По-умолчанию - без блокировки
+        """
+        return contextlib.nullcontext()
+
     @staticmethod
-    def factory(db_type=None):
+    def factory(db_type=None, shard=None):
         """
         Фабричный метод, возвращающий соединение с БД указанного типа \n
         :param db_type: тип БД, к которой необходимо подключиться (MySQL, Sqlite и пр.).
         По-умолчанию = Sqlite
+        :param shard: номер шарда (только для шардированной БД). По-умолчанию = 0
         :return: объект подключения к БД
         """
         if db_type is None:
@@ -44,6 +96,10 @@ class ConnectionManager(metaclass=ABCMeta):
 
         if db_type == Databases.SQLITE:
             return SqliteConnectionManager()
+        elif db_type == Databases.SQLITE_SHARDED:
+            return ShardedSqliteConnectionManager(shard)
+        elif db_type == Databases.SQLITE_MEMORY:
+            return MemorySqliteConnectionManager()
         elif db_type == Databases.MYSQL:
             return MySqlConnectionManager()
         else:
@@ -57,6 +113,7 @@ class SqliteConnectionManager(ConnectionManager):
     def __init__(self):
         # Создать подключение к БД (sqlite)
         self.__connection = sqlite3.connect(SQLITE_CONNECTION_STR)
+        _init_database(self.__connection, SQLITE_CONNECTION_STR)
 
         # Указть преобразователи модели данных
         # sqlite3.register_adapter(Speciality, ModelAdapters.speciality_adapter)
@@ -69,6 +126,280 @@ class SqliteConnectionManager(ConnectionManager):
         self.__connection.close()
 
 
+class ShardedSqliteConnectionManager(ConnectionManager):
+    """
+    Класс подключения к одному из шардов БД SQLITE \n
+    Записи Student распределяются по файлам шардов, Speciality - справочник, реплицируемый во все шарды.
+    ИД записей Student глобально уникальны: шард записи однозначно определяется остатком ИД % кол-во шардов
+    """
+    _round_robin = itertools.count()
+
+    def __init__(self, shard=None):
+        self.__shard = 0 if shard is None else shard
+        if not (0 <= self.__shard < self.shards_count()):
+            raise ValueError("Неверный номер шарда БД: '{0}'".format(shard))
+
+        # Создать подключение к шарду БД (sqlite) и структуру БД шарда при первом подключении к нему
+        path = SQLITE_SHARD_CONNECTION_STRS[self.__shard]
+        self.__connection = sqlite3.connect(path)
+        if _init_database(self.__connection, path, (SQLITE_CREATE_SHARD_SCRIPT,)):
+            self.__connection.execute("INSERT OR IGNORE INTO ShardSequence(shard, seq) VALUES (?, ?)",
+                                      (self.__shard, self.__shard))
+            self.__connection.commit()
+
+    @property
+    def shard(self):
+        return self.__shard
+
+    def get_connection(self):
+        return self.__connection
+
+    def close_connection(self):
+        self.__connection.close()
+
+    @staticmethod
+    def shards_count():
+        return len(SQLITE_SHARD_CONNECTION_STRS)
+
+    @staticmethod
+    def shards():
+        """
+        :return: номера всех шардов БД
+        """
+        return range(ShardedSqliteConnectionManager.shards_count())
+
+    @staticmethod
+    def shard_of(entity_id):
+        """
+        Метод возвращает номер шарда, в котором хранится запись с указанным ИД \n
+        :param entity_id: ИД записи
+        :return: номер шарда
+        """
+        return int(entity_id) % ShardedSqliteConnectionManager.shards_count()
+
+    @classmethod
+    def shard_for(cls, params):
+        """
+        Метод выбирает шард для новой записи по ключу шардирования (SQLITE_SHARD_KEY) \n
+        :param params: параметры записи (dict)
+        :return: номер шарда
+        """
+        if params.get("id") is not None:
+            return cls.shard_of(params["id"])
+        if params.get(SQLITE_SHARD_KEY) is not None:
+            return cls.shard_of(params[SQLITE_SHARD_KEY])
+        return next(cls._round_robin) % cls.shards_count()
+
+    @classmethod
+    def allocate_id(cls, shard, entity_id=None):
+        """
+        Метод выделяет глобально уникальный ИД новой записи в указанном шарде
+        (ИД % кол-во шардов = номер шарда). Указанный явно ИД резервируется в последовательности шарда \n
+        :param shard: номер шарда
+        :param entity_id: явно указанный ИД записи
+        :return: ИД записи
+        """
+        connect_manager = cls(shard)
+        connection = connect_manager.get_connection()
+
+        try:
+            if entity_id is None:
+                connection.execute("UPDATE ShardSequence SET seq = seq + ? WHERE shard = ?",
+                                   (cls.shards_count(), shard))
+            else:
+                connection.execute("UPDATE ShardSequence SET seq = max(seq, ?) WHERE shard = ?",
+                                   (entity_id, shard))
+            seq = connection.execute("SELECT seq FROM ShardSequence WHERE shard = ?", (shard,)).fetchone()[0]
+            connection.commit()
+        finally:
+            connect_manager.close_connection()
+
+        return seq if entity_id is None else entity_id
+
+    @classmethod
+    def populate_shards(cls, source=SQLITE_CONNECTION_STR):
+        """
+        Метод переносит данные из нешардированной БД в шарды: Speciality копируется во все шарды,
+        Student - в шард, определяемый ИД записи \n
+        :param source: путь к файлу исходной БД
+        """
+        for shard in cls.shards():
+            connect_manager = cls(shard)
+            connection = connect_manager.get_connection()
+
+            try:
+                connection.execute("ATTACH DATABASE ? AS src", (source,))
+                connection.execute("INSERT OR REPLACE INTO Speciality SELECT * FROM src.Speciality")
+                connection.execute("INSERT OR REPLACE INTO Student SELECT * FROM src.Student WHERE id % ? = ?",
+                                   (cls.shards_count(), shard))
+                max_id = connection.execute("SELECT ifnull(max(id), 0) FROM src.Student").fetchone()[0]
+                connection.commit()
+                connection.execute("DETACH DATABASE src")
+            finally:
+                connect_manager.close_connection()
+
+            # Наибольший ИД шарда, не превышающий max_id: следующие ИД не пересекутся с перенесенными
+            if max_id > shard:
+                cls.allocate_id(shard, max_id - (max_id - shard) % cls.shards_count())
+
+
+class MemorySqliteConnectionManager(ConnectionManager):
+    """
+    Класс подключения к копии БД SQLITE, загруженной в память (:memory:) \n
+    Все запросы выполняются на общем соединении с БД в памяти: монопольно только на время выполнения запроса
+    и чтения результата (см. lock()). Изменения записываются в файл БД: синхронно с каждой операцией ("sync")
+    либо периодическим резервным копированием ("periodic")
+    """
+    # Блокировки захватываются только в порядке: _startup_lock -> _checkpoint_lock -> _lock
+    _startup_lock = threading.RLock()
+    _lock = threading.RLock()
+    _checkpoint_lock = threading.Lock()
+    _memory_connection = None
+    _disk_connection = None
+    _durability = None
+    _dirty = False
+    _backup_thread = None
+    _backup_stop = None
+
+    def __init__(self):
+        # Соединение с БД в памяти общее для всех экземпляров: создается при первом подключении
+        with self._startup_lock:
+            if self._memory_connection is None:
+                self.startup()
+
+    def get_connection(self):
+        return self._memory_connection
+
+    def close_connection(self):
+        # Соединение с БД в памяти не закрывается
+        pass
+
+    def lock(self):
+        return self._lock
+
+    def write_through(self, sql, params=None, row_id=None):
+        cls = type(self)
+        if cls._durability == "sync":
+            # Добавленная запись получает на диске тот же ИД, что и в памяти (именованный параметр id)
+            if row_id is not None and isinstance(params, dict):
+                params = dict(params, id=row_id)
+            try:
+                if params is None:
+                    cls._disk_connection.executescript(sql)
+                else:
+                    cls._disk_connection.execute(sql, params)
+            except sqlite3.DatabaseError:
+                cls._disk_connection.rollback()
+                raise
+            else:
+                cls._disk_connection.commit()
+        else:
+            cls._dirty = True
+
+    @classmethod
+    def startup(cls, durability=None, interval=None):
+        """
+        Метод загружает БД в память (sqlite3 backup API) и запускает запись изменений на диск.
+        Ранее загруженная БД предварительно выгружается (shutdown) \n
+        :param durability: режим записи на диск: "sync" | "periodic". По-умолчанию = SQLITE_MEMORY_DURABILITY
+        :param interval: интервал (сек.) периодического копирования. По-умолчанию = SQLITE_MEMORY_BACKUP_INTERVAL
+        """
+        durability = SQLITE_MEMORY_DURABILITY if durability is None else durability
+        interval = SQLITE_MEMORY_BACKUP_INTERVAL if interval is None else interval
+        if durability not in ("sync", "periodic"):
+            raise ValueError("Неверный режим записи БД на диск: '{0}'".format(durability))
+
+        with cls._startup_lock:
+            cls.shutdown()
+
+            with cls._lock:
+                cls._disk_connection = sqlite3.connect(SQLITE_CONNECTION_STR, check_same_thread=False)
+                _init_database(cls._disk_connection, SQLITE_CONNECTION_STR)
+                cls._memory_connection = sqlite3.connect(":memory:", check_same_thread=False)
+                cls._disk_connection.backup(cls._memory_connection)
+                cls._durability = durability
+                cls._dirty = False
+
+                if durability == "periodic":
+                    cls._backup_stop = threading.Event()
+                    cls._backup_thread = threading.Thread(target=cls.__backup_loop,
+                                                          args=(cls._backup_stop, interval),
+                                                          name="sqlite-memory-backup", daemon=True)
+                    cls._backup_thread.start()
+
+        print("БД загружена в память [режим записи на диск: {0}]".format(durability))
+
+    @classmethod
+    def __backup_loop(cls, stop, interval):
+        while not stop.wait(interval):
+            cls.checkpoint(stop)
+
+    @classmethod
+    def checkpoint(cls, stop=None):
+        """
+        Метод записывает на диск изменения БД в памяти, не сохраненные с последней контрольной точки.
+        Копирование выполняется порциями по SQLITE_MEMORY_BACKUP_PAGES страниц, между порциями соединение
+        с БД в памяти доступно другим потокам (изменения, выполненные между порциями, также попадают в копию) \n
+        :param stop: событие остановки: пока оно не установлено, ожидается освобождение соединения с БД
+        """
+        with cls._checkpoint_lock:
+            # Не ждать соединение бесконечно: shutdown() может ожидать завершения потока копирования
+            while not cls._lock.acquire(timeout=0.1):
+                if stop is not None and stop.is_set():
+                    return
+            try:
+                cls.__backup_to_disk()
+            finally:
+                cls._lock.release()
+
+    @classmethod
+    def __backup_to_disk(cls, release=True):
+        # Вызывается при удерживаемых _checkpoint_lock и _lock (всегда в этом порядке).
+        # release = False - не освобождать соединение между порциями (изменения других потоков не допускаются)
+        if cls._memory_connection is None or not cls._dirty:
+            return
+        cls._dirty = False
+        try:
+            cls._memory_connection.backup(cls._disk_connection, pages=SQLITE_MEMORY_BACKUP_PAGES,
+                                          progress=cls.__release_between_steps if release else None)
+        except BaseException:
+            cls._dirty = True
+            raise
+
+    @classmethod
+    def __release_between_steps(cls, status, remaining, total):
+        cls._lock.release()
+        cls._lock.acquire()
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Метод останавливает периодическое копирование, записывает последние изменения на диск
+        и закрывает соединения с БД
+        """
+        with cls._lock:
+            backup_thread, cls._backup_thread = cls._backup_thread, None
+            if backup_thread is not None:
+                cls._backup_stop.set()
+
+        # Дождаться остановки потока копирования, не удерживая соединение с БД
+        if backup_thread is not None and backup_thread is not threading.current_thread():
+            backup_thread.join()
+
+        with cls._checkpoint_lock, cls._lock:
+            if cls._memory_connection is None:
+                return
+
+            # Соединения закрываются сразу после копирования: изменения между порциями были бы потеряны
+            cls.__backup_to_disk(release=False)
+            cls._memory_connection.close()
+            cls._disk_connection.close()
+            cls._memory_connection = cls._disk_connection = None
+
+
+atexit.register(MemorySqliteConnectionManager.shutdown)
+
+
 class MySqlConnectionManager(ConnectionManager):
     """
     Класс подключения к БД MySQL